@@ -0,0 +1,63 @@
+"""location rtree
+
+Revision ID: 86a9a4cdf2b2
+Revises: 0db2eb91affe
+Create Date: 2026-10-15 09:12:04.518311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '86a9a4cdf2b2'
+down_revision: Union[str, None] = '0db2eb91affe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite R*Tree index over location points, kept in sync with triggers
+    op.execute(
+        "CREATE VIRTUAL TABLE location_rtree USING rtree(id, min_lat, max_lat, min_long, max_long)"
+    )
+    op.execute(
+        "INSERT INTO location_rtree (id, min_lat, max_lat, min_long, max_long) "
+        "SELECT id, latitude, latitude, longitude, longitude FROM location"
+    )
+    op.execute(
+        """
+        CREATE TRIGGER location_rtree_insert AFTER INSERT ON location
+        BEGIN
+            INSERT INTO location_rtree (id, min_lat, max_lat, min_long, max_long)
+            VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER location_rtree_update AFTER UPDATE OF latitude, longitude ON location
+        BEGIN
+            UPDATE location_rtree
+            SET min_lat = new.latitude, max_lat = new.latitude,
+                min_long = new.longitude, max_long = new.longitude
+            WHERE id = new.id;
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER location_rtree_delete AFTER DELETE ON location
+        BEGIN
+            DELETE FROM location_rtree WHERE id = old.id;
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER location_rtree_delete")
+    op.execute("DROP TRIGGER location_rtree_update")
+    op.execute("DROP TRIGGER location_rtree_insert")
+    op.execute("DROP TABLE location_rtree")
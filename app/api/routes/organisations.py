@@ -1,58 +1,161 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from sqlmodel import select, Session
-from typing import Optional, Tuple
+import hashlib
+
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, status, Depends, Path, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Join, insert, lambda_stmt
+from sqlalchemy.ext.compiler import compiles
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated, Optional
 from app.db import get_db
-from app.models import Location, Organisation, CreateOrganisation
+from app.models import Location, LocationCreate, LocationRead, Organisation, CreateOrganisation, location_rtree
 
 router = APIRouter()
 
+# responses of the organisation read endpoints, cleared on every write.
+# Invalidation is per process: with several uvicorn workers, a write only clears the cache of
+# the worker that served it and the others keep serving their entries until the TTL expires.
+_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+# bumped around every invalidation, so a read that started before a write does not store its result
+_cache_generation = 0
+
+_NOCACHE_QUERY = Query(False, description="Bypass the response cache")
+
+OrganisationId = Annotated[int, Path(ge=1)]
+
+_CACHE_CONTROL = "public, max-age=60"
+
+
+class _CrossJoin(Join):
+    """
+    Inner join rendered as CROSS JOIN on SQLite, which makes the planner keep the left table as the outer loop
+    """
+    inherit_cache = True
+
+
+@compiles(_CrossJoin, "sqlite")
+def _compile_cross_join(join, compiler, **kw) -> str:
+    return compiler.visit_join(join, **kw).replace(" JOIN ", " CROSS JOIN ", 1)
+
+
+def _invalidate_cache() -> None:
+    """
+    Clears the response cache after a write
+    """
+    global _cache_generation
+    _cache_generation += 1
+    _cache.clear()
+    _cache_generation += 1
+
+
+def _store_cache_entry(cache_key: tuple, cache_entry: tuple[str, bytes], generation: int) -> None:
+    """
+    Stores a cache entry unless the cache was invalidated since generation was read
+    """
+    if generation == _cache_generation:
+        _cache[cache_key] = cache_entry
+
+
+def _cache_entry(content: object) -> tuple[str, bytes]:
+    """
+    Serialises response content once and derives its ETag from the body
+    :return: (etag, body) tuple as stored in the response cache
+    """
+    body = orjson.dumps(content)
+    return f'W/"{hashlib.sha1(body).hexdigest()}"', body
+
+
+def _cached_response(request: Request, cache_entry: tuple[str, bytes]) -> Response:
+    """
+    Builds a cacheable JSON response, 304 Not Modified when the client already holds the same body
+    """
+    etag, body = cache_entry
+    headers = {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    if_none_match = {tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")}
+    # "*" matches any current representation (RFC 9110, section 13.1.2)
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @router.post("/create", response_model=Organisation)
-def create_organisation(create_organisation: CreateOrganisation, session: Session = Depends(get_db)) -> Organisation:
-    """Create an organisation."""
-    organisation = Organisation(name=create_organisation.name)
-    session.add(organisation)
-    session.commit()
-    session.refresh(organisation)
+async def create_organisation(create_organisation: CreateOrganisation, session: AsyncSession = Depends(get_db)) -> Organisation:
+    """Create an organisation, optionally with its locations in the same transaction."""
+    # RETURNING hands back the generated id with the insert, no refresh needed
+    organisation = (
+        await session.exec(insert(Organisation).values(name=create_organisation.name).returning(Organisation))
+    ).scalar_one()
+    if create_organisation.locations:
+        await session.exec(
+            insert(Location),
+            params=[
+                {"organisation_id": organisation.id, **location_data.model_dump()}
+                for location_data in create_organisation.locations
+            ],
+        )
+    await session.commit()
+    _invalidate_cache()
     return organisation
 
 
 
 
 @router.get("/", response_model=list[Organisation])
-def get_organisations(session: Session = Depends(get_db)) -> list[Organisation]:
+async def get_organisations(
+    request: Request, nocache: bool = _NOCACHE_QUERY, session: AsyncSession = Depends(get_db)
+) -> Response:
     """
     Get all organisations.
     """
-    organisations = session.exec(select(Organisation)).all()
-    return organisations
+    cache_key = ("orgs",)
+    cache_entry = None if nocache else _cache.get(cache_key)
+    if cache_entry is None:
+        generation = _cache_generation
+        # plain column rows, no ORM instances are built for the response
+        organisations = [
+            {"id": organisation_id, "name": name}
+            for organisation_id, name in await session.exec(select(Organisation.id, Organisation.name))
+        ]
+        cache_entry = _cache_entry(organisations)
+        _store_cache_entry(cache_key, cache_entry, generation)
+    return _cached_response(request, cache_entry)
 
 
 
 @router.get("/{organisation_id}", response_model=Organisation)
-def get_organisation(organisation_id: int, session: Session = Depends(get_db)) -> Organisation:
+async def get_organisation(
+    request: Request,
+    organisation_id: OrganisationId,
+    nocache: bool = _NOCACHE_QUERY,
+    session: AsyncSession = Depends(get_db),
+) -> Response:
     """
     Get an organisation by id.
     """
-    organisation = session.get(Organisation, organisation_id)
-    if organisation is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organisation not found")
-    return organisation
-
-
-@router.post("/create/locations")
-def create_location():
-    raise NotImplementedError
-
-
-@router.get("/{organisation_id}/locations", response_model=list[Location])
-def get_organisation_locations(
-        organisation_id: int,
-        bounding_box: Optional[Tuple[float, float, float, float]] = Query(
-            None,
-            description="Bounding box as (min_latitude, max_latitude, min_longitude, max_longitude)"
-        ),
-        session: Session = Depends(get_db)
-) -> list[Location]:
+    cache_key = ("org", organisation_id)
+    cache_entry = None if nocache else _cache.get(cache_key)
+    if cache_entry is None:
+        generation = _cache_generation
+        organisation = await session.get(Organisation, organisation_id)
+        if organisation is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organisation not found")
+        cache_entry = _cache_entry(organisation.model_dump())
+        _store_cache_entry(cache_key, cache_entry, generation)
+    return _cached_response(request, cache_entry)
+
+
+@router.get("/{organisation_id}/locations", response_model=list[LocationRead])
+async def get_organisation_locations(
+        organisation_id: OrganisationId,
+        min_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box minimum latitude"),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box maximum latitude"),
+        min_long: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box minimum longitude"),
+        max_long: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box maximum longitude"),
+        session: AsyncSession = Depends(get_db)
+) -> ORJSONResponse:
     #location_ids = session.exec(select(Location.id).where(Location.organisation_id==organisation_id)).all()
     #result = []
     #for location_id in location_ids:
@@ -60,45 +163,80 @@ def get_organisation_locations(
     #    result.append({"location_name": location.location_name, "location_longitude": location.longitude, "location_latitude": location.latitude })
     #return result
 
+    # cheap existence check first, so an unknown organisation is told apart from an empty result
+    if not await session.scalar(select(1).where(Organisation.id == organisation_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organisation not found")
+
     # getting all locations for the given organisation in a single query
-    qry = select(Location).where(Location.organisation_id == organisation_id)
-    if bounding_box:
-        min_lat, max_lat, min_long, max_long = bounding_box
-        qry = qry.where(
-            (Location.latitude >= min_lat) &
-            (Location.latitude <= max_lat) &
-            (Location.longitude >= min_long) &
-            (Location.longitude <= max_long)
+    # lambda statements are compiled once per query shape and then served from the compiled cache
+    qry = lambda_stmt(
+        lambda: select(Location.id, Location.location_name, Location.longitude, Location.latitude).where(
+            Location.organisation_id == organisation_id
+        )
+    )
+    if min_lat is None or max_lat is None or min_long is None or max_long is None:
+        if any(bound is not None for bound in (min_lat, max_lat, min_long, max_long)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Bounding box needs all of min_lat, max_lat, min_long and max_long"
+            )
+    else:
+        if min_lat > max_lat or min_long > max_long:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Bounding box minimums must not exceed its maximums"
+            )
+        # the R-tree narrows down candidates, it stores 32-bit floats rounded outwards
+        # so it is queried for overlap and the exact check is done on the location columns.
+        # It has to drive the join, otherwise SQLite scans the organisation's locations and
+        # only probes the R-tree by id for each of them.
+        qry += lambda s: s.select_from(
+            _CrossJoin(location_rtree, Location, col(Location.id) == location_rtree.c.id)
+        ).where(
+            location_rtree.c.max_lat >= min_lat,
+            location_rtree.c.min_lat <= max_lat,
+            location_rtree.c.max_long >= min_long,
+            location_rtree.c.min_long <= max_long,
         )
-    locations = session.exec(qry).all()
-    if not locations:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No locations found for organisation with ID {organisation_id} with the given bounding box"
+        qry += lambda s: s.where(
+            col(Location.latitude).between(min_lat, max_lat),
+            col(Location.longitude).between(min_long, max_long),
         )
-    return locations
+    # plain rows, no ORM instances are built for the response
+    locations = [row._asdict() for row in await session.execute(qry)]
+    return ORJSONResponse(locations)
 
 @router.post("/{organisation_id}/create/location", response_model=Location)
-def create_location(
-    organisation_id: int,
-    location_data: Location,
-    session: Session = Depends(get_db)
+async def create_location(
+    organisation_id: OrganisationId,
+    location_data: LocationCreate,
+    session: AsyncSession = Depends(get_db)
 ) -> Location:
     """
     create a location for an organisation.
     """
-    organisation = session.get(Organisation, organisation_id)
-    if organisation is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organisation not found")
+    return (await create_location_bulk(organisation_id, [location_data], session))[0]
 
-    # create and add  new location
-    location = Location(
-        organisation_id=organisation_id,
-        location_name=location_data.location_name,
-        longitude=location_data.longitude,
-        latitude=location_data.latitude
-    )
-    session.add(location)
-    session.commit()
-    session.refresh(location)
-    return location
\ No newline at end of file
+
+@router.post("/{organisation_id}/create/locations", response_model=list[Location])
+async def create_location_bulk(
+    organisation_id: OrganisationId,
+    locations_data: list[LocationCreate],
+    session: AsyncSession = Depends(get_db)
+) -> list[Location]:
+    """
+    create several locations for an organisation in a single transaction.
+    """
+    if not await session.scalar(select(1).where(Organisation.id == organisation_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organisation not found")
+    if not locations_data:
+        return []
+
+    # one executemany INSERT, RETURNING hands back the generated ids in parameter order
+    locations = (await session.scalars(
+        insert(Location).returning(Location, sort_by_parameter_order=True),
+        [{"organisation_id": organisation_id, **location_data.model_dump()} for location_data in locations_data],
+    )).all()
+    await session.commit()
+    _invalidate_cache()
+    return list(locations)
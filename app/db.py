@@ -1,21 +1,70 @@
 from contextlib import contextmanager
-from typing import Generator
+from functools import cache
+from typing import AsyncGenerator, Generator
 
 import sqlmodel
-from sqlalchemy import create_engine, Engine
+from sqlalchemy import create_engine, event, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
 
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Tunes every new SQLite connection: WAL journal without fsync per commit, 64 MiB page cache
+    and 256 MiB memory mapped IO
+    """
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+@cache
 def get_engine() -> Engine:
-    return create_engine("sqlite:///backend.db", echo=True)
+    """
+    Returns the sync engine used by get_database_session outside the API
+    :return: SQLAlchemy Engine
+    """
+    engine = create_engine("sqlite:///backend.db", echo=True)
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
 
 
-def get_db() -> Generator[Session, None, None]:
+@cache
+def get_async_engine() -> AsyncEngine:
     """
-    Retrieves new SQLAlchemy Session from connection pool
-    :yield: SQLAlchemy Session
+    Returns the process wide async engine used by the API endpoints
+    :return: SQLAlchemy AsyncEngine
     """
-    with sqlmodel.Session(get_engine()) as session:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///backend.db",
+        echo=True,
+        query_cache_size=1200,
+        pool_size=20,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Retrieves new SQLAlchemy AsyncSession from connection pool.
+    Objects are not expired on commit, so endpoints can return them without a refresh.
+    :yield: SQLAlchemy AsyncSession
+    """
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
         yield session
 
 
@@ -1,10 +1,11 @@
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from app.api.route import api_router
 
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.include_router(api_router, prefix="/api")
\ No newline at end of file
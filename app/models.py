@@ -1,11 +1,19 @@
+from sqlalchemy import Index, column, table
 from sqlmodel import SQLModel, Field, Relationship
 
 
 class Base(SQLModel):
     pass
 
+class LocationCreate(Base):
+    location_name: str
+    longitude: float
+    latitude: float
+
+
 class CreateOrganisation(Base):
     name: str
+    locations: list[LocationCreate] = Field(default_factory=list)
 
 
 class Organisation(Base, table=True):
@@ -14,9 +22,33 @@ class Organisation(Base, table=True):
 
 
 class Location(Base, table=True):
+    __table_args__ = (
+        Index("ix_location_org_lat_long", "organisation_id", "latitude", "longitude"),
+    )
+
     id: int | None = Field(primary_key=True)
     organisation_id: int = Field(foreign_key="organisation.id")
-    organisation: Organisation = Relationship()
+    # lazy loading is disabled to rule out N+1 queries, use selectinload() where it is needed
+    organisation: Organisation = Relationship(sa_relationship_kwargs={"lazy": "raise"})
     location_name: str
     longitude: float
     latitude: float
+
+
+class LocationRead(Base):
+    id: int
+    location_name: str
+    longitude: float
+    latitude: float
+
+
+# SQLite R*Tree virtual table mirroring Location coordinates (maintained by triggers,
+# see migration 86a9a4cdf2b2). Not part of the metadata as it cannot be created by SQLAlchemy.
+location_rtree = table(
+    "location_rtree",
+    column("id"),
+    column("min_lat"),
+    column("max_lat"),
+    column("min_long"),
+    column("max_long"),
+)
@@ -8,10 +8,13 @@ import alembic.config
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 
+from app.api.routes import organisations as organisations_routes
 from app.db import get_database_session
 from app.main import app
-from app.models import Organisation, Location
+from app.models import Base, Organisation, Location
 
 _ALEMBIC_INI_PATH = Path(__file__).parent.parent / "alembic.ini"
 
@@ -19,9 +22,9 @@ _ALEMBIC_INI_PATH = Path(__file__).parent.parent / "alembic.ini"
 def test_client() -> TestClient:
     return TestClient(app)
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def apply_alembic_migrations() -> Generator[None, None, None]:
-    # Creates test database per test function
+    # Creates test database once per test session
     test_db_file_name = f"test_{uuid4()}.db"
     database_path = Path(test_db_file_name)
     try:
@@ -30,13 +33,30 @@ def apply_alembic_migrations() -> Generator[None, None, None]:
         alembic_cfg.attributes["sqlalchemy_url"] = test_db_url
         alembic.command.upgrade(alembic_cfg, "head")
         test_engine = create_engine(test_db_url, echo=True)
-        with patch("app.db.get_engine") as mock_engine:
+        # TestClient runs the app on its own event loop, so no connections are pooled across loops
+        test_async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{test_db_file_name}", echo=True, poolclass=NullPool
+        )
+        with patch("app.db.get_engine") as mock_engine, patch("app.db.get_async_engine") as mock_async_engine:
             mock_engine.return_value = test_engine
+            mock_async_engine.return_value = test_async_engine
             yield
+        test_engine.dispose()
     finally:
         database_path.unlink(missing_ok=True)
 
 
+@pytest.fixture(autouse=True)
+def clean_database() -> Generator[None, None, None]:
+    # Endpoints commit through their own async connections, so tests are isolated by
+    # emptying the tables afterwards instead of rolling back a shared transaction
+    organisations_routes._cache.clear()
+    yield
+    with get_database_session() as database_session:
+        for table in reversed(Base.metadata.sorted_tables):
+            database_session.exec(table.delete())
+        database_session.commit()
+
 def test_organisation_endpoints(test_client: TestClient) -> None:
     list_of_organisation_names_to_create = ["organisation_a", "organisation_b", "organisation_c"]
 
@@ -65,6 +85,86 @@ def test_organisation_endpoints(test_client: TestClient) -> None:
 
 
 
+def test_create_organisation_with_locations(test_client: TestClient) -> None:
+    location_data = [
+        {"location_name": "Location 1", "longitude": -65.0, "latitude": 12.6},
+        {"location_name": "Location 2", "longitude": -12.5, "latitude": 20.7},
+    ]
+    response = test_client.post(
+        "/api/organisations/create", json={"name": "organisation_with_locations", "locations": location_data}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    organisation_id = response.json()["id"]
+
+    response = test_client.get(f"/api/organisations/{organisation_id}/locations")
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(location["location_name"] for location in response.json()) == ["Location 1", "Location 2"]
+
+
+def test_get_organisation_is_cached(test_client: TestClient) -> None:
+    response = test_client.post("/api/organisations/create", json={"name": "organisation_cached"})
+    organisation_id = response.json()["id"]
+
+    response = test_client.get(f"/api/organisations/{organisation_id}")
+    assert response.json()["name"] == "organisation_cached"
+
+    # Rename behind the API's back, cached response is still served
+    with get_database_session() as database_session:
+        organisation = database_session.get(Organisation, organisation_id)
+        organisation.name = "organisation_renamed"
+        database_session.commit()
+
+    response = test_client.get(f"/api/organisations/{organisation_id}")
+    assert response.json()["name"] == "organisation_cached"
+
+    response = test_client.get(f"/api/organisations/{organisation_id}", params={"nocache": True})
+    assert response.json()["name"] == "organisation_renamed"
+
+    # Writes invalidate the cache
+    test_client.post("/api/organisations/create", json={"name": "organisation_other"})
+    response = test_client.get(f"/api/organisations/{organisation_id}")
+    assert response.json()["name"] == "organisation_renamed"
+
+
+def test_cache_not_filled_by_read_overtaken_by_write(test_client: TestClient) -> None:
+    response = test_client.post("/api/organisations/create", json={"name": "organisation_a"})
+    organisation_id = response.json()["id"]
+    stale_entry = organisations_routes._cache_entry([{"id": organisation_id, "name": "organisation_a"}])
+
+    # a read takes its generation, then a write commits before the read stores its result
+    generation = organisations_routes._cache_generation
+    test_client.post("/api/organisations/create", json={"name": "organisation_b"})
+    organisations_routes._store_cache_entry(("orgs",), stale_entry, generation)
+
+    response = test_client.get("/api/organisations/")
+    assert set(organisation["name"] for organisation in response.json()) == {"organisation_a", "organisation_b"}
+
+
+def test_get_organisation_etag(test_client: TestClient) -> None:
+    response = test_client.post("/api/organisations/create", json={"name": "organisation_etag"})
+    organisation_id = response.json()["id"]
+
+    for url in ("/api/organisations/", f"/api/organisations/{organisation_id}"):
+        response = test_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Cache-Control"] == "public, max-age=60"
+        etag = response.headers["ETag"]
+
+        response = test_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+        response = test_client.get(url, headers={"If-None-Match": "*"})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # a new organisation changes the listing and with it the ETag
+    etag = test_client.get("/api/organisations/").headers["ETag"]
+    test_client.post("/api/organisations/create", json={"name": "organisation_other"})
+    response = test_client.get("/api/organisations/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
 def test_create_location_endpoint(test_client: TestClient) -> None:
     # creating an organisation first to associate with a location
     response = test_client.post("/api/organisations/create", json={"name": "organisation_test"})
@@ -76,7 +176,7 @@ def test_create_location_endpoint(test_client: TestClient) -> None:
         "longitude": -33.32,
         "latitude": 20.10
     }
-    response = test_client.post(f"/api/{organisation_id}/create/location", json=loc_data)
+    response = test_client.post(f"/api/organisations/{organisation_id}/create/location", json=loc_data)
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["location_name"] == "Location 1"
 
@@ -87,6 +187,28 @@ def test_create_location_endpoint(test_client: TestClient) -> None:
     assert locations[0].location_name == "Location 1"
 
 
+def test_create_locations_bulk_endpoint(test_client: TestClient) -> None:
+    response = test_client.post("/api/organisations/create", json={"name": "organisation_bulk"})
+    organisation_id = response.json()["id"]
+
+    location_data = [
+        {"location_name": "Location 1", "longitude": -65.0, "latitude": 12.6},
+        {"location_name": "Location 2", "longitude": -12.5, "latitude": 20.7},
+    ]
+    response = test_client.post(f"/api/organisations/{organisation_id}/create/locations", json=location_data)
+    assert response.status_code == status.HTTP_200_OK
+    assert [location["location_name"] for location in response.json()] == ["Location 1", "Location 2"]
+    assert all(location["organisation_id"] == organisation_id for location in response.json())
+
+    with get_database_session() as database_session:
+        locations = database_session.query(Location).filter_by(organisation_id=organisation_id).all()
+        database_session.expunge_all()
+    assert len(locations) == 2
+
+    response = test_client.post(f"/api/organisations/{organisation_id + 1}/create/locations", json=location_data)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 def test_get_locations_endpoint(test_client: TestClient) -> None:
     # creating an organisation and associated locations
     response = test_client.post("/api/organisations/create", json={"name": "organisation_for_locations"})
@@ -99,21 +221,69 @@ def test_get_locations_endpoint(test_client: TestClient) -> None:
     ]
 
     for loc in location_data:
-        response = test_client.post(f"/api/{organisation_id}/create/location", json=loc)
+        response = test_client.post(f"/api/organisations/{organisation_id}/create/location", json=loc)
         assert response.status_code == status.HTTP_200_OK
 
     #get locations without a bounding box
-    response = test_client.get(f"/api/{organisation_id}/locations")
+    response = test_client.get(f"/api/organisations/{organisation_id}/locations")
     assert response.status_code == status.HTTP_200_OK
     assert len(response.json()) == 2
 
     # get locations with a bounding box which includes only one location
-    response = test_client.get(f"/api/{organisation_id}/locations?bounding_box=12.6,20.7,-65.0,-12.5")
+    response = test_client.get(
+        f"/api/organisations/{organisation_id}/locations",
+        params={"min_lat": 12.6, "max_lat": 20.0, "min_long": -65.0, "max_long": -12.5},
+    )
     assert response.status_code == status.HTTP_200_OK
     assert len(response.json()) == 1
     assert response.json()[0]["location_name"] == "Location 1"
 
+    # bounding box without matching locations gives an empty list
+    response = test_client.get(
+        f"/api/organisations/{organisation_id}/locations",
+        params={"min_lat": 0.0, "max_lat": 1.0, "min_long": 0.0, "max_long": 1.0},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+    # incomplete bounding box is rejected
+    response = test_client.get(
+        f"/api/organisations/{organisation_id}/locations",
+        params={"min_lat": 12.6, "max_lat": 20.0},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # inverted bounding box is rejected
+    response = test_client.get(
+        f"/api/organisations/{organisation_id}/locations",
+        params={"min_lat": 5.0, "max_lat": 0.0, "min_long": -65.0, "max_long": -12.5},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # NaN and out of range coordinates fail validation
+    for params in (
+        {"min_lat": "nan", "max_lat": 20.0, "min_long": -65.0, "max_long": -12.5},
+        {"min_lat": 12.6, "max_lat": 91.0, "min_long": -65.0, "max_long": -12.5},
+        {"min_lat": 12.6, "max_lat": 20.0, "min_long": -181.0, "max_long": -12.5},
+    ):
+        response = test_client.get(f"/api/organisations/{organisation_id}/locations", params=params)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
 def test_get_locations_not_found(test_client: TestClient) -> None:
-    response = test_client.get("/api/1/locations")
+    response = test_client.get("/api/organisations/1/locations")
     assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert response.json()["detail"] == "Locations found for organisation with ID 1"
\ No newline at end of file
+    assert response.json()["detail"] == "Organisation not found"
+
+
+def test_get_locations_empty(test_client: TestClient) -> None:
+    response = test_client.post("/api/organisations/create", json={"name": "organisation_without_locations"})
+    organisation_id = response.json()["id"]
+
+    response = test_client.get(f"/api/organisations/{organisation_id}/locations")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+
+def test_invalid_organisation_id(test_client: TestClient) -> None:
+    response = test_client.get("/api/organisations/0/locations")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY